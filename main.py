@@ -1,14 +1,23 @@
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup, Tag
 from curl_cffi import requests
+from lxml import etree
+from lxml import html as lxml_html
 from rfeed import Feed, Guid, Item
 from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
+logger = logging.getLogger(__name__)
+
 FEED_LINK = "https://mahoon2.github.io/custom_rss_feed/CNSfeed.xml"
 
 TRUST_HEADERS = {
@@ -16,8 +25,82 @@ TRUST_HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
+SESSION = requests.Session(impersonate="safari15_5", headers=TRUST_HEADERS)
+
+
+def has_class(name: str) -> str:
+    """Build an XPath predicate matching one token of the class attribute."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Journal page queries, compiled once per process.
+NATURE_CARDS = etree.XPath(f"//article[{has_class('c-card')}]")
+NATURE_TITLE = etree.XPath(f".//h3[{has_class('c-card__title')}]//a")
+NATURE_SUMMARY = etree.XPath(".//div[@data-test='article-description']//p")
+NATURE_TIME = etree.XPath(".//time[@itemprop='datePublished']")
+
+SCIENCE_CARDS = etree.XPath(f"//div[{has_class('card')}]")
+SCIENCE_LABEL = etree.XPath(f".//span[{has_class('overline')}]")
+SCIENCE_TITLE = etree.XPath(f".//h2[{has_class('article-title')}]//a")
+SCIENCE_SUMMARY = etree.XPath(f".//ul[{has_class('card-contribs')}]")
+SCIENCE_TIME = etree.XPath(f".//div[{has_class('card-meta')}]//time")
+
+CELL_ITEMS = etree.XPath(f"//div[{has_class('toc__item')}]")
+CELL_TITLE = etree.XPath(f".//h3[{has_class('toc__item__title')}]//a")
+CELL_SUMMARY = etree.XPath(f".//div[{has_class('toc__item__brief')}]")
+CELL_DATE = etree.XPath(f".//div[{has_class('toc__item__date')}]")
+
+# Visible text only; script and style bodies are skipped like bs4's get_text.
+TEXT_NODES = etree.XPath(
+    ".//text()[not(ancestor::script or ancestor::style)]", smart_strings=False
+)
+
+# <meta charset>, <meta http-equiv content="...; charset=..."> or <?xml encoding=...?>
+# within the first 1024 bytes, the window browsers prescan for a declaration.
+CHARSET_DECLARATION = re.compile(
+    rb"""<(?:meta[^>]+charset|\?xml[^>]+encoding)\s*=\s*["']?\s*([\w.:-]+)""",
+    re.IGNORECASE,
+)
+
+# Overline labels that mark a Science card as primary research.
+SCIENCE_LABELS = ("research article", "research resource", "short article")
+SCIENCE_LABEL_PATTERN = re.compile(
+    "|".join(map(re.escape, SCIENCE_LABELS)), re.IGNORECASE
+)
+
+MONTH_NAMES = (
+    "january",
+    "february",
+    "march",
+    "april",
+    "may",
+    "june",
+    "july",
+    "august",
+    "september",
+    "october",
+    "november",
+    "december",
+)
+MONTH_NUMBERS = {
+    key: number
+    for number, name in enumerate(MONTH_NAMES, start=1)
+    for key in (name, name[:3])
+}
+
+# Journal dates fromisoformat rejects: "May 12, 2024", "12 May 2024" and unpadded
+# numeric dates such as "2024-5-12" or "2024-5-12T9:00:00".
+DATE_PATTERNS = (
+    re.compile(r"(?P<month>[A-Za-z]+)\s+(?P<day>\d{1,2}),\s+(?P<year>\d{4})"),
+    re.compile(r"(?P<day>\d{1,2})\s+(?P<month>[A-Za-z]+)\s+(?P<year>\d{4})"),
+    re.compile(
+        r"(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})"
+        r"(?:T(?P<hour>\d{1,2}):(?P<minute>\d{1,2}):(?P<second>\d{1,2}))?"
+    ),
+)
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Article:
     title: str
     link: str
@@ -26,7 +109,7 @@ class Article:
     source: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class JournalConfig:
     name: str
     url: str
@@ -81,133 +164,191 @@ def is_transient_error(exception: Exception) -> bool:
     wait=wait_exponential(multiplier=1, min=1, max=10),
     stop=stop_after_attempt(5),
 )
-def fetch_html(url: str) -> str:
-    """Retrieve the HTML body for a provided URL."""
-    response = requests.get(
-        url,
-        timeout=30,
-        allow_redirects=True,
-        impersonate="safari15_5",
-        headers=TRUST_HEADERS,
-    )
+def fetch_html(url: str) -> Tuple[bytes, Optional[str]]:
+    """Retrieve the raw HTML body and any Content-Type charset for a provided URL."""
+    response = SESSION.get(url, timeout=30, allow_redirects=True)
     response.raise_for_status()
-    return response.text
+    return response.content, response.charset_encoding
+
+
+def parse_formatted_date(value: str) -> Optional[datetime]:
+    """Parse the journal date strings that datetime.fromisoformat rejects."""
+    for pattern in DATE_PATTERNS:
+        match = pattern.fullmatch(value)
+        if not match:
+            continue
+        fields = match.groupdict(default="0")
+        month_text = fields["month"]
+        month = (
+            int(month_text)
+            if month_text.isdigit()
+            else MONTH_NUMBERS.get(month_text.lower())
+        )
+        if month is None:
+            continue
+        try:
+            return datetime(
+                int(fields["year"]),
+                month,
+                int(fields["day"]),
+                int(fields.get("hour", "0")),
+                int(fields.get("minute", "0")),
+                int(fields.get("second", "0")),
+                tzinfo=timezone.utc,
+            )
+        except ValueError:
+            return None
+    return None
 
 
+@lru_cache(maxsize=4096)
 def parse_date(value: Optional[str]) -> Optional[datetime]:
     """Convert assorted date representations into timezone-aware datetime objects."""
     if not value:
         return None
     cleaned = value.strip()
-    if ":" in cleaned and not cleaned.startswith("20"):
-        parts = cleaned.split(":", 1)
-        cleaned = parts[1].strip() if len(parts) > 1 else parts[0].strip()
-    iso_candidate = cleaned.replace("Z", "+00:00")
+    if not cleaned:
+        return None
+    # Strip label prefixes such as "Published: " unless the value is already a date.
+    if cleaned[:2] not in ("19", "20") and ":" in cleaned:
+        cleaned = cleaned.split(":", 1)[1].strip()
     try:
-        parsed = datetime.fromisoformat(iso_candidate)
+        parsed = datetime.fromisoformat(cleaned)
         return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
     except ValueError:
-        formats = ("%B %d, %Y", "%d %b %Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S")
-        for fmt in formats:
-            try:
-                return datetime.strptime(cleaned, fmt).replace(tzinfo=timezone.utc)
-            except ValueError:
-                continue
-    return None
+        return parse_formatted_date(cleaned)
 
 
-def text_or_empty(tag: Optional[Tag]) -> str:
-    """Return the stripped text of a tag or an empty string."""
-    return tag.get_text(" ", strip=True) if tag else ""
+def page_encoding(html: bytes, declared: Optional[str]) -> str:
+    """Pick the page charset: HTTP header, then in-document declaration, then UTF-8."""
+    if declared:
+        return declared
+    match = CHARSET_DECLARATION.search(html, 0, 1024)
+    return match[1].decode("ascii") if match else "utf-8"
 
 
-def parse_nature(html: str, config: JournalConfig) -> List[Article]:
-    """Extract article data from the Nature research page."""
-    soup = BeautifulSoup(html, "html.parser")
-    cards = soup.select("article.c-card")
-    articles: List[Article] = []
-    for card in cards:
-        title_tag = card.select_one("h3.c-card__title a")
-        if not title_tag:
+@lru_cache(maxsize=None)
+def html_parser(encoding: str) -> lxml_html.HTMLParser:
+    """Return a reusable HTML parser for an encoding, falling back to UTF-8."""
+    try:
+        return lxml_html.HTMLParser(encoding=encoding)
+    except LookupError:
+        return lxml_html.HTMLParser(encoding="utf-8")
+
+
+def make_tree(
+    html: bytes, encoding: Optional[str] = None
+) -> Optional[lxml_html.HtmlElement]:
+    """Parse raw page bytes, returning None for a blank or unparseable page."""
+    if not html.strip():
+        return None
+    parser = html_parser(page_encoding(html, encoding))
+    try:
+        return lxml_html.fromstring(html, parser=parser)
+    except etree.ParserError:
+        return None
+
+
+def first_match(
+    query: etree.XPath, element: lxml_html.HtmlElement
+) -> Optional[lxml_html.HtmlElement]:
+    """Return the first element matched by a compiled query, if any."""
+    matches = query(element)
+    return matches[0] if matches else None
+
+
+def text_or_empty(element: Optional[lxml_html.HtmlElement]) -> str:
+    """Return the whitespace-joined, stripped text of an element or an empty string."""
+    if element is None:
+        return ""
+    parts = [stripped for text in TEXT_NODES(element) if (stripped := text.strip())]
+    return " ".join(parts)
+
+
+@lru_cache(maxsize=2048)
+def join_url(base: str, href: str) -> str:
+    """Resolve an article href against the journal base URL."""
+    return urljoin(base, href)
+
+
+def parse_nature(
+    tree: lxml_html.HtmlElement, config: JournalConfig
+) -> Iterator[Article]:
+    """Yield article data from the Nature research page."""
+    for card in NATURE_CARDS(tree):
+        title_tag = first_match(NATURE_TITLE, card)
+        if title_tag is None:
             continue
-        summary_tag = card.select_one('div[data-test="article-description"] p')
-        time_tag = card.select_one('time[itemprop="datePublished"]')
-        published = (
-            parse_date(time_tag.get("datetime"))
-            if time_tag and time_tag.get("datetime")
-            else parse_date(text_or_empty(time_tag))
-        )
-        articles.append(
-            Article(
-                title=text_or_empty(title_tag),
-                link=urljoin(config.base_url, title_tag.get("href", "")),
-                summary=text_or_empty(summary_tag),
-                published=published,
-                source=config.name,
-            )
+        title = text_or_empty(title_tag)
+        href = title_tag.get("href", "")
+        if not title or not href:
+            continue
+        summary_tag = first_match(NATURE_SUMMARY, card)
+        time_tag = first_match(NATURE_TIME, card)
+        dt_attr = time_tag.get("datetime") if time_tag is not None else None
+        published = parse_date(dt_attr or text_or_empty(time_tag))
+        yield Article(
+            title=title,
+            link=join_url(config.base_url, href),
+            summary=text_or_empty(summary_tag),
+            published=published,
+            source=config.name,
         )
-    return articles
-
 
-def parse_science(html: str, config: JournalConfig) -> List[Article]:
-    """Extract Science research article data using explicit Research labels."""
-    soup = BeautifulSoup(html, "html.parser")
-    cards = soup.select("div.card")
-    articles: List[Article] = []
-    valid_labels = ("research article", "research resource", "short article")
 
-    for card in cards:
-        label_tag = card.select_one("span.overline")
-        if not label_tag:
+def parse_science(
+    tree: lxml_html.HtmlElement, config: JournalConfig
+) -> Iterator[Article]:
+    """Yield Science research article data using explicit Research labels."""
+    for card in SCIENCE_CARDS(tree):
+        label_tag = first_match(SCIENCE_LABEL, card)
+        if label_tag is None:
             continue
-        label_text = text_or_empty(label_tag).lower()
-        if not any(term in label_text for term in valid_labels):
+        if not SCIENCE_LABEL_PATTERN.search(text_or_empty(label_tag)):
             continue
 
-        title_tag = card.select_one("h2.article-title a")
-        if not title_tag:
+        title_tag = first_match(SCIENCE_TITLE, card)
+        if title_tag is None:
             continue
-        summary_tag = card.select_one("ul.card-contribs")
-        time_tag = card.select_one("div.card-meta time")
-        published = (
-            parse_date(time_tag.get("datetime"))
-            if time_tag and time_tag.get("datetime")
-            else parse_date(text_or_empty(time_tag))
-        )
-        articles.append(
-            Article(
-                title=text_or_empty(title_tag),
-                link=urljoin(config.base_url, title_tag.get("href", "")),
-                summary=text_or_empty(summary_tag),
-                published=published,
-                source=config.name,
-            )
+        title = text_or_empty(title_tag)
+        href = title_tag.get("href", "")
+        if not title or not href:
+            continue
+        summary_tag = first_match(SCIENCE_SUMMARY, card)
+        time_tag = first_match(SCIENCE_TIME, card)
+        dt_attr = time_tag.get("datetime") if time_tag is not None else None
+        published = parse_date(dt_attr or text_or_empty(time_tag))
+        yield Article(
+            title=title,
+            link=join_url(config.base_url, href),
+            summary=text_or_empty(summary_tag),
+            published=published,
+            source=config.name,
         )
-    return articles
 
 
-def parse_cell(html: str, config: JournalConfig) -> List[Article]:
-    """Extract article data from the Cell new articles page."""
-    soup = BeautifulSoup(html, "html.parser")
-    items = soup.select("div.toc__item")
-    articles: List[Article] = []
-    for item in items:
-        title_tag = item.select_one("h3.toc__item__title a")
-        if not title_tag:
+def parse_cell(
+    tree: lxml_html.HtmlElement, config: JournalConfig
+) -> Iterator[Article]:
+    """Yield article data from the Cell new articles page."""
+    for item in CELL_ITEMS(tree):
+        title_tag = first_match(CELL_TITLE, item)
+        if title_tag is None:
             continue
-        summary_tag = item.select_one("div.toc__item__brief")
-        date_tag = item.select_one("div.toc__item__date")
+        title = text_or_empty(title_tag)
+        href = title_tag.get("href", "")
+        if not title or not href:
+            continue
+        summary_tag = first_match(CELL_SUMMARY, item)
+        date_tag = first_match(CELL_DATE, item)
         published = parse_date(text_or_empty(date_tag))
-        articles.append(
-            Article(
-                title=text_or_empty(title_tag),
-                link=urljoin(config.base_url, title_tag.get("href", "")),
-                summary=text_or_empty(summary_tag),
-                published=published,
-                source=config.name,
-            )
+        yield Article(
+            title=title,
+            link=join_url(config.base_url, href),
+            summary=text_or_empty(summary_tag),
+            published=published,
+            source=config.name,
         )
-    return articles
 
 
 PARSER_MAP = {
@@ -217,16 +358,21 @@ PARSER_MAP = {
 }
 
 
-def parse_journal(html: str, config: JournalConfig) -> List[Article]:
-    """Parse the journal page using the CSS-based parser for that journal."""
+def parse_journal(
+    tree: Optional[lxml_html.HtmlElement], config: JournalConfig
+) -> List[Article]:
+    """Parse the journal page using the XPath-based parser for that journal."""
     parser = PARSER_MAP.get(config.name)
     if not parser:
         return []
-    candidates = parser(html, config)
-    print(f"Extracted {len(candidates)} JSON-LD entries.")
-    filtered = [article for article in candidates if article.title and article.link]
-    print(f"Filtered down to {len(filtered)} valid articles.")
-    return filtered
+    if tree is None:
+        logger.warning("blank or unparseable page journal=%s", config.name)
+        return []
+    articles = list(parser(tree, config))
+    logger.debug("articles=%d journal=%s", len(articles), config.name)
+    if not articles:
+        logger.warning("no articles parsed journal=%s", config.name)
+    return articles
 
 
 def ensure_timezone(value: Optional[datetime]) -> datetime:
@@ -237,19 +383,17 @@ def ensure_timezone(value: Optional[datetime]) -> datetime:
     return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
 
 
-def build_feed(articles: Iterable[Article], channel_link: str) -> str:
-    """Serialize the list of Article objects into RSS 2.0 XML."""
-    unique_links = set()
-    sorted_articles = sorted(
-        articles,
-        key=lambda entry: ensure_timezone(entry.published),
-        reverse=True,
-    )
+def build_feed(articles: Iterable[Article], channel_link: str) -> bytes:
+    """Serialize the list of Article objects into UTF-8 encoded RSS 2.0 XML."""
+    newest: Dict[str, Tuple[datetime, Article]] = {}
+    for article in articles:
+        published = ensure_timezone(article.published)
+        current = newest.get(article.link)
+        if current is None or published > current[0]:
+            newest[article.link] = (published, article)
+    decorated = sorted(newest.values(), key=itemgetter(0), reverse=True)
     items: List[Item] = []
-    for article in sorted_articles:
-        if article.link in unique_links:
-            continue
-        unique_links.add(article.link)
+    for _, article in decorated:
         items.append(
             Item(
                 title=f"{article.source}: {article.title}",
@@ -266,18 +410,19 @@ def build_feed(articles: Iterable[Article], channel_link: str) -> str:
         language="en-US",
         items=items,
     )
-    return feed.rss()
+    return feed.rss().encode("utf-8")
 
 
 def main() -> None:
     """Generate CNSfeed.xml by scraping configured journals."""
+    logging.basicConfig(level=(os.environ.get("LOG_LEVEL") or "INFO").upper())
     articles: List[Article] = []
-    for config in JOURNAL_CONFIGS:
-        print(f"Fetching {config.name}...")
-        html = fetch_html(config.url)
-        articles.extend(parse_journal(html, config))
-    feed_content = build_feed(articles, FEED_LINK)
-    Path("CNSfeed.xml").write_text(feed_content, encoding="utf-8")
+    print(f"Fetching {', '.join(config.name for config in JOURNAL_CONFIGS)}...")
+    with SESSION, ThreadPoolExecutor(max_workers=len(JOURNAL_CONFIGS)) as executor:
+        pages = executor.map(fetch_html, (config.url for config in JOURNAL_CONFIGS))
+        for config, (html, encoding) in zip(JOURNAL_CONFIGS, pages):
+            articles.extend(parse_journal(make_tree(html, encoding), config))
+    Path("CNSfeed.xml").write_bytes(build_feed(articles, FEED_LINK))
 
 
 if __name__ == "__main__":